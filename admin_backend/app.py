@@ -29,6 +29,10 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
+# Compact, unsorted JSON responses (analytics results can be large)
+app.json.compact = True
+app.json.sort_keys = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -47,16 +51,16 @@ def initialize_services():
         # Initialize search service
         search_service = AzureSearchService()
         
-        # Initialize analytics service
-        analytics_service = AnalyticsService()
-        
-        # Initialize Cosmos DB client (for existing endpoints)
+        # Initialize Cosmos DB client (shared by the endpoints and the analytics service)
         COSMOS_ENDPOINT = os.getenv('AZURE_COSMOS_ENDPOINT')
         COSMOS_KEY = os.getenv('AZURE_COSMOS_KEY')
         if COSMOS_ENDPOINT and COSMOS_KEY:
             cosmos_client = CosmosClient(COSMOS_ENDPOINT, COSMOS_KEY)
             logger.info("✅ Cosmos DB client initialized")
         
+        # Initialize analytics service
+        analytics_service = AnalyticsService(cosmos_client)
+        
         # Initialize LLM for chatbot
         if os.getenv('AZURE_OPENAI_ENDPOINT') and os.getenv('AZURE_OPENAI_KEY'):
             llm = AzureChatOpenAI(
@@ -1,122 +1,257 @@
 # admin_backend/services/analytics.py
 
 import os
+import time
+import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
-from azure.cosmos import CosmosClient
+from azure.cosmos.aio import CosmosClient as AsyncCosmosClient
+from azure.core.exceptions import AzureError
 from collections import defaultdict
+from itertools import chain
+from operator import itemgetter
 
 logger = logging.getLogger(__name__)
 
+# Max conversation upserts in flight during conversation processing
+UPSERT_CONCURRENCY = 64
+
+# Max values in a single Cosmos SQL IN expression
+IN_CLAUSE_LIMIT = 200
+
+# Seconds a run_analytics result is served from memory
+ANALYTICS_CACHE_TTL_SECONDS = 60
+
+# Items per page requested from Cosmos query feeds
+QUERY_PAGE_SIZE = 1000
+
+# Projections used instead of SELECT * ("case" is a reserved word in Cosmos SQL)
+TURN_FIELDS = (
+    'c.session_id, c.timestamp, c.turn_number, c.conversation_turn, '
+    'c.current_issue, c.current_case, c.user_message, c.bot_response'
+)
+CONVERSATION_FIELDS = (
+    'c.id, c.session_id, c.conversation_result, c.message_count, '
+    'c.duration, c.total_turns, c.issue, c["case"]'
+)
+
+# conversation_result values counted in the performance breakdown
+RESULT_TYPES = ("solved", "escalated", "abandoned", "interrupted")
+
 class AnalyticsService:
     """Service for handling analytics operations"""
     
-    def __init__(self):
-        self.cosmos_endpoint = os.environ.get('AZURE_COSMOS_ENDPOINT')
-        self.cosmos_key = os.environ.get('AZURE_COSMOS_KEY')
+    def __init__(self, cosmos_client=None):
+        # Process-wide sync client owned by the app; conversation processing opens its own async client
+        self.cosmos_client = cosmos_client
         self.database_name = os.environ.get('AZURE_COSMOS_DATABASE', 'voc-analytics')
+        # (monotonic time, result) of the last run_analytics call
+        self._analytics_cache = None
         
-        if self.cosmos_endpoint and self.cosmos_key:
-            self.client = CosmosClient(self.cosmos_endpoint, self.cosmos_key)
-            self.database = self.client.get_database_client(self.database_name)
-        else:
+        if not cosmos_client:
             logger.warning("Cosmos DB credentials not found")
-            self.client = None
-            self.database = None
+
+    def _get_container(self, name):
+        """Return a container client on the shared Cosmos client"""
+        if not self.cosmos_client:
+            raise RuntimeError("Cosmos DB client not configured")
+        return self.cosmos_client.get_database_client(self.database_name).get_container_client(name)
 
     def run_conversation_processing(self):
         """Main conversation processing logic"""
+        result = asyncio.run(self._run_conversation_processing())
+        if result.get("conversations_saved"):
+            # New conversations make the cached analytics stale
+            self._analytics_cache = None
+        return result
+
+    async def _run_conversation_processing(self):
+        """Conversation processing on the async Cosmos client"""
         # Initialize Cosmos DB client
         cosmos_endpoint = os.environ['AZURE_COSMOS_ENDPOINT']
         cosmos_key = os.environ['AZURE_COSMOS_KEY']
         database_name = os.environ.get('AZURE_COSMOS_DATABASE', 'voc-analytics')
         
-        client = CosmosClient(cosmos_endpoint, cosmos_key)
-        database = client.get_database_client(database_name)
-        
-        # Define time window (process last 15 minutes to align with timer)
-        end_time = datetime.now(timezone.utc) - timedelta(minutes=5)  # 5 min buffer
-        start_time = end_time - timedelta(minutes=15)
-        
-        logger.info(f"Processing window: {start_time} to {end_time}")
+        async with AsyncCosmosClient(cosmos_endpoint, cosmos_key) as client:
+            database = client.get_database_client(database_name)
+            
+            # Define time window (process last 15 minutes to align with timer)
+            end_time = datetime.now(timezone.utc) - timedelta(minutes=5)  # 5 min buffer
+            start_time = end_time - timedelta(minutes=15)
+            
+            logger.info(f"Processing window: {start_time} to {end_time}")
+            
+            # Fetch turns in this window
+            turns_container = database.get_container_client('turns')
+            
+            query = f"""
+            SELECT {TURN_FIELDS} FROM c 
+            WHERE c.timestamp >= @start_time 
+            AND c.timestamp <= @end_time
+            ORDER BY c.timestamp
+            """
+            
+            parameters = [
+                {"name": "@start_time", "value": start_time.isoformat()},
+                {"name": "@end_time", "value": end_time.isoformat()}
+            ]
+            
+            # Group the window's turns by session as the feed is read
+            turns_found = 0
+            turns_by_session = defaultdict(list)
+            async for turn in turns_container.query_items(
+                query=query,
+                parameters=parameters,
+                max_item_count=QUERY_PAGE_SIZE
+            ):
+                turns_found += 1
+                session_id = turn.get('session_id')
+                if session_id:
+                    turns_by_session[session_id].append(turn)
+            
+            logger.info(f"Found {turns_found} turns to process")
+            
+            if not turns_found:
+                return {"message": "No turns found in time window", "processed": 0}
+            
+            logger.info(f"Found {len(turns_by_session)} distinct sessions")
+            
+            # Only sessions with history outside the window need another query
+            needs_refetch = {
+                session_id for session_id, session_turns in turns_by_session.items()
+                if not self._has_complete_history(session_turns)
+            }
+            logger.info(f"Re-fetching {len(needs_refetch)} sessions with earlier turns")
+            
+            if needs_refetch:
+                refetched, failed_session_ids = await self._fetch_turns_by_sessions(turns_container, needs_refetch)
+                turns_by_session.update(refetched)
+                # Skip sessions whose history could not be read; saving only the window's
+                # turns would overwrite the stored conversation with a partial one
+                for session_id in failed_session_ids:
+                    del turns_by_session[session_id]
+            
+            # Analyze every session first
+            processed_at = datetime.utcnow().isoformat()
+            conversations = []
+            for session_id, session_turns in turns_by_session.items():
+                try:
+                    conversation_data = self.analyze_conversation(session_turns)
+                    if conversation_data:
+                        conversation_data['processed_at'] = processed_at
+                        conversations.append(conversation_data)
+                except Exception as e:
+                    logger.error(f"Error processing session {session_id}: {str(e)}")
+            
+            # Save to conversations container with bounded concurrency
+            conversations_container = database.get_container_client('conversations')
+            saved_count = await self._upsert_conversations(conversations_container, conversations)
         
-        # Fetch turns in this window
-        turns_container = database.get_container_client('turns')
+        return {
+            "message": "Conversation processing completed",
+            "turns_found": turns_found,
+            "sessions_processed": len(turns_by_session),
+            "conversations_saved": saved_count
+        }
+
+    @staticmethod
+    def _has_complete_history(session_turns):
+        """True if the turns cover the session from its first turn (turn_number 1..n)"""
+        turn_numbers = {turn.get('turn_number') for turn in session_turns}
+        return turn_numbers == set(range(1, len(session_turns) + 1))
+
+    async def _fetch_turns_by_sessions(self, turns_container, session_ids):
+        """Fetch all turns for the given sessions, grouped by session_id.
         
-        query = """
-        SELECT * FROM c 
-        WHERE c.timestamp >= @start_time 
-        AND c.timestamp <= @end_time
+        Returns (turns_by_session, failed_session_ids); a failed chunk or session
+        does not stop the others.
         """
-        
-        parameters = [
-            {"name": "@start_time", "value": start_time.isoformat()},
-            {"name": "@end_time", "value": end_time.isoformat()}
-        ]
-        
-        turns = list(turns_container.query_items(
-            query=query,
-            parameters=parameters,
-            enable_cross_partition_query=True
+        turns_by_session = {}
+        failed_session_ids = set()
+        session_list = list(session_ids)
+        
+        # One IN query per IN_CLAUSE_LIMIT sessions, all in flight at once
+        results = await asyncio.gather(*(
+            self._fetch_turn_chunk(turns_container, session_list[i:i + IN_CLAUSE_LIMIT])
+            for i in range(0, len(session_list), IN_CLAUSE_LIMIT)
         ))
         
-        logger.info(f"Found {len(turns)} turns to process")
+        for chunk_turns, chunk_failed in results:
+            turns_by_session.update(chunk_turns)
+            failed_session_ids.update(chunk_failed)
         
-        if not turns:
-            return {"message": "No turns found in time window", "processed": 0}
+        return turns_by_session, failed_session_ids
+
+    async def _fetch_turn_chunk(self, turns_container, chunk):
+        """Fetch turns for up to IN_CLAUSE_LIMIT sessions. Returns (turns_by_session, failed_session_ids)"""
+        placeholders = ", ".join(f"@s{j}" for j in range(len(chunk)))
+        query = (
+            f"SELECT {TURN_FIELDS} FROM c WHERE c.session_id IN ({placeholders}) "
+            "ORDER BY c.timestamp"
+        )
+        parameters = [{"name": f"@s{j}", "value": session_id} for j, session_id in enumerate(chunk)]
+        
+        try:
+            chunk_turns = defaultdict(list)
+            async for turn in turns_container.query_items(query=query, parameters=parameters):
+                chunk_turns[turn['session_id']].append(turn)
+            return chunk_turns, set()
+        except (AzureError, asyncio.TimeoutError) as e:
+            logger.warning(f"IN query failed, falling back to per-session queries: {str(e)}")
+        
+        chunk_turns = {}
+        failed_session_ids = set()
+        for session_id in chunk:
+            try:
+                chunk_turns[session_id] = await self._fetch_session_turns(turns_container, session_id)
+            except (AzureError, asyncio.TimeoutError) as e:
+                logger.error(f"Error fetching turns for session {session_id}: {str(e)}")
+                failed_session_ids.add(session_id)
         
-        # Get distinct sessions
-        session_ids = set()
-        for turn in turns:
-            session_id = turn.get('session_id')
-            if session_id:
-                session_ids.add(session_id)
+        return chunk_turns, failed_session_ids
+
+    async def _fetch_session_turns(self, turns_container, session_id):
+        """Fetch all turns for a single session"""
+        session_query = f"SELECT {TURN_FIELDS} FROM c WHERE c.session_id = @session_id ORDER BY c.timestamp"
+        session_params = [{"name": "@session_id", "value": session_id}]
+        
+        return [turn async for turn in turns_container.query_items(
+            query=session_query,
+            parameters=session_params,
+            partition_key=session_id
+        )]
+
+    async def _upsert_conversations(self, conversations_container, conversations):
+        """Upsert conversations concurrently. Returns the number saved."""
+        semaphore = asyncio.Semaphore(UPSERT_CONCURRENCY)
         
-        logger.info(f"Found {len(session_ids)} distinct sessions")
+        async def upsert(conversation_data):
+            async with semaphore:
+                return await conversations_container.upsert_item(conversation_data)
         
-        # Process each session
-        saved_count = 0
-        conversations_container = database.get_container_client('conversations')
+        results = await asyncio.gather(
+            *(upsert(conversation_data) for conversation_data in conversations),
+            return_exceptions=True
+        )
         
-        for session_id in session_ids:
-            try:
-                # Fetch all turns for this session
-                session_query = "SELECT * FROM c WHERE c.session_id = @session_id"
-                session_params = [{"name": "@session_id", "value": session_id}]
-                
-                session_turns = list(turns_container.query_items(
-                    query=session_query,
-                    parameters=session_params,
-                    enable_cross_partition_query=True
-                ))
-                
-                # Analyze conversation
-                conversation_data = self.analyze_conversation(session_turns)
-                
-                if conversation_data:
-                    # Save to conversations container
-                    conversation_data['processed_at'] = datetime.utcnow().isoformat()
-                    conversations_container.upsert_item(conversation_data)
-                    saved_count += 1
-                    
-            except Exception as e:
-                logger.error(f"Error processing session {session_id}: {str(e)}")
-                continue
+        saved_count = 0
+        for conversation_data, result in zip(conversations, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error saving session {conversation_data.get('session_id')}: {str(result)}")
+            else:
+                saved_count += 1
         
-        return {
-            "message": "Conversation processing completed",
-            "turns_found": len(turns),
-            "sessions_processed": len(session_ids),
-            "conversations_saved": saved_count
-        }
+        return saved_count
 
     def analyze_conversation(self, turns):
         """Analyze conversation turns and extract key information"""
         if not turns:
             return None
         
-        # Sort by timestamp
-        sorted_turns = sorted(turns, key=lambda x: x.get('timestamp', ''))
+        # Sort by timestamp (queries return turns already ordered, so this is a linear pass)
+        for turn in turns:
+            turn.setdefault('timestamp', '')
+        sorted_turns = sorted(turns, key=itemgetter('timestamp'))
         
         first_turn = sorted_turns[0]
         last_turn = sorted_turns[-1]
@@ -128,34 +263,30 @@ class AnalyticsService:
         elif len(turns) < 3:
             result = "abandoned"
         
-        # Find issue and case_type
+        # Single forward pass: latest issue/case_type and message history
+        # (user message if present, then bot reply, per turn) into a pre-sized list
         issue = None
         case_type = None
-        for turn in reversed(sorted_turns):
-            if not issue and turn.get('current_issue'):
-                issue = turn['current_issue']
-            if not case_type and turn.get('current_case'):
-                case_type = turn['current_case']
-            if issue and case_type:
-                break
-        
-        # Extract message history
-        message_history = []
+        message_history = [None] * (2 * len(sorted_turns))
+        j = 0
         for turn in sorted_turns:
-            if turn.get('user_message'):
-                message_history.append({
-                    'type': 'user',
-                    'message': turn['user_message'],
-                    'timestamp': turn.get('timestamp'),
-                    'turn': turn.get('conversation_turn', 0)
-                })
+            get = turn.get
+            current_issue = get('current_issue')
+            if current_issue:
+                issue = current_issue
+            current_case = get('current_case')
+            if current_case:
+                case_type = current_case
             
-            message_history.append({
-                'type': 'bot',
-                'message': turn['bot_response'],
-                'timestamp': turn.get('timestamp'),
-                'turn': turn.get('conversation_turn', 0)
-            })
+            timestamp = get('timestamp')
+            turn_number = get('conversation_turn', 0)
+            user_message = get('user_message')
+            if user_message:
+                message_history[j] = {'type': 'user', 'message': user_message, 'timestamp': timestamp, 'turn': turn_number}
+                j += 1
+            message_history[j] = {'type': 'bot', 'message': turn['bot_response'], 'timestamp': timestamp, 'turn': turn_number}
+            j += 1
+        del message_history[j:]
         
         # Build conversation data
         conversation_data = {
@@ -167,7 +298,7 @@ class AnalyticsService:
             'case': case_type,
             'conversation_result': result,
             'total_turns': len(turns),
-            'message_count': len(turns) * 2,
+            'message_count': len(message_history),
             'message_history': message_history
         }
         
@@ -178,38 +309,43 @@ class AnalyticsService:
     # ============================================================================
 
     def run_analytics(self):
-        """Main analytics logic"""
-        # Initialize Cosmos DB client
-        cosmos_endpoint = os.environ['AZURE_COSMOS_ENDPOINT']
-        cosmos_key = os.environ['AZURE_COSMOS_KEY']
-        database_name = os.environ.get('AZURE_COSMOS_DATABASE', 'voc-analytics')
-        
-        client = CosmosClient(cosmos_endpoint, cosmos_key)
-        database = client.get_database_client(database_name)
-        
-        # Fetch all conversations
-        conversations_container = database.get_container_client('conversations')
-        conversations = list(conversations_container.query_items(
-            query="SELECT * FROM c",
-            enable_cross_partition_query=True
-        ))
-        
-        logger.info(f"Found {len(conversations)} conversations for analytics")
-        
-        if not conversations:
+        """Main analytics logic (results are reused for ANALYTICS_CACHE_TTL_SECONDS)"""
+        cached = self._analytics_cache
+        if cached and time.monotonic() - cached[0] < ANALYTICS_CACHE_TTL_SECONDS:
+            logger.info("Returning cached analytics result")
+            return cached[1]
+        
+        result = self._compute_analytics()
+        self._analytics_cache = (time.monotonic(), result)
+        return result
+
+    def _compute_analytics(self):
+        """Calculate metrics and save the summary to the statistics container"""
+        conversations_container = self._get_container('conversations')
+        
+        # Calculate metrics page by page; only one page is held in memory
+        pages = conversations_container.query_items(
+            query=f"SELECT {CONVERSATION_FIELDS} FROM c",
+            enable_cross_partition_query=True,
+            max_item_count=QUERY_PAGE_SIZE
+        ).by_page()
+        metrics = self.calculate_analytics_metrics(chain.from_iterable(pages))
+        total_conversations = metrics["volume"]["total_conversations"]
+        
+        logger.info(f"Found {total_conversations} conversations for analytics")
+        
+        if not total_conversations:
             return {"message": "No conversations found", "metrics": None}
         
-        # Calculate metrics
-        metrics = self.calculate_analytics_metrics(conversations)
-        
         # Save summary
-        statistics_container = database.get_container_client('statistics')
+        statistics_container = self._get_container('statistics')
+        now = datetime.utcnow()
         summary = {
-            "id": f"overall_summary_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
+            "id": f"overall_summary_{now.strftime('%Y%m%d_%H%M%S')}",
             "type": "overall_summary",
-            "date": datetime.utcnow().strftime('%Y-%m-%d'),
+            "date": now.strftime('%Y-%m-%d'),
             "metrics": metrics,
-            "generated_at": datetime.utcnow().isoformat()
+            "generated_at": now.isoformat()
         }
         
         statistics_container.create_item(summary)
@@ -217,72 +353,74 @@ class AnalyticsService:
         return {
             "message": "Analytics completed successfully",
             "summary_id": summary["id"],
-            "conversations_processed": len(conversations),
+            "conversations_processed": total_conversations,
             "metrics": metrics
         }
 
     def calculate_analytics_metrics(self, conversations):
-        """Calculate metrics for conversations"""
-        total_conversations = len(conversations)
+        """Calculate metrics for conversations (any iterable, consumed once)"""
+        total_conversations = 0
         total_messages = 0
         unique_sessions = set()
         
         # Performance counters
-        solved_count = 0
-        escalated_count = 0
-        abandoned_count = 0
-        interrupted_count = 0
+        breakdown = dict.fromkeys(RESULT_TYPES, 0)
         
-        # For averages
-        durations = []
-        turns = []
+        # Running sums for averages
+        duration_sum = duration_count = 0
+        turns_sum = turns_count = 0
         
         # Distribution counters
         issue_types = defaultdict(int)
         case_types = defaultdict(int)
-        unidentified_conversations = []
+        unidentified_count = 0
+        unidentified_ids = []
         
-        # Process each conversation
+        # Process each conversation in a single pass
         for conv in conversations:
+            get = conv.get
+            
             # Volume metrics
-            total_messages += conv.get('message_count', 0)
-            if conv.get('session_id'):
-                unique_sessions.add(conv['session_id'])
+            total_conversations += 1
+            total_messages += get('message_count', 0)
+            session_id = get('session_id')
+            if session_id:
+                unique_sessions.add(session_id)
             
             # Performance metrics
-            status = conv.get('conversation_result', '').lower()
-            if status == 'solved':
-                solved_count += 1
-            elif status == 'escalated':
-                escalated_count += 1
-            elif status == 'abandoned':
-                abandoned_count += 1
-            elif status == 'interrupted':
-                interrupted_count += 1
+            status = get('conversation_result', '').lower()
+            if status in breakdown:
+                breakdown[status] += 1
             
             # Duration and turns
-            if conv.get('duration'):
-                durations.append(conv['duration'])
-            if conv.get('total_turns'):
-                turns.append(conv['total_turns'])
+            duration = get('duration')
+            if duration:
+                duration_sum += duration
+                duration_count += 1
+            total_turns = get('total_turns')
+            if total_turns:
+                turns_sum += total_turns
+                turns_count += 1
             
             # Issue distribution
-            issue_type = conv.get('issue')
+            issue_type = get('issue')
             if issue_type:
                 issue_types[issue_type] += 1
             
-            case_type = conv.get('case')
+            case_type = get('case')
             if case_type:
                 case_types[case_type] += 1
             
-            # Unidentified cases
+            # Unidentified cases (only the first 10 ids are reported)
             if not issue_type and not case_type:
-                unidentified_conversations.append(conv.get('id', 'unknown'))
+                unidentified_count += 1
+                if unidentified_count <= 10:
+                    unidentified_ids.append(get('id', 'unknown'))
         
         # Calculate averages
-        avg_duration = sum(durations) / len(durations) if durations else 0
-        avg_turns = sum(turns) / len(turns) if turns else 0
-        success_rate = (solved_count / total_conversations * 100) if total_conversations > 0 else 0
+        avg_duration = duration_sum / duration_count if duration_count else 0
+        avg_turns = turns_sum / turns_count if turns_count else 0
+        success_rate = (breakdown["solved"] / total_conversations * 100) if total_conversations > 0 else 0
         
         return {
             "volume": {
@@ -292,19 +430,14 @@ class AnalyticsService:
             },
             "performance": {
                 "success_rate": round(success_rate, 2),
-                "breakdown": {
-                    "solved": solved_count,
-                    "escalated": escalated_count,
-                    "abandoned": abandoned_count,
-                    "interrupted": interrupted_count
-                },
+                "breakdown": breakdown,
                 "avg_conversation_length": round(avg_turns, 2),
                 "avg_resolution_time_minutes": round(avg_duration, 2)
             },
             "issue_distribution": dict(issue_types),
             "case_distribution": dict(case_types),
             "unidentified": {
-                "count": len(unidentified_conversations),
-                "conversation_ids": unidentified_conversations[:10]
+                "count": unidentified_count,
+                "conversation_ids": unidentified_ids
             }
-        }
\ No newline at end of file
+        }
@@ -2,7 +2,7 @@
 
 import logging
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from langchain_openai import AzureChatOpenAI
 from models.state import ChatbotState, update_state_metadata
 
@@ -10,7 +10,13 @@ from services.azure_search import AzureSearchService
 
 logger = logging.getLogger(__name__)
 
-def issue_classification_node(state: ChatbotState, config: Dict[str, Any], llm: AzureChatOpenAI, search_service: AzureSearchService) -> ChatbotState:
+def issue_classification_node(
+    state: ChatbotState,
+    config: Dict[str, Any],
+    llm: AzureChatOpenAI,
+    search_service: AzureSearchService,
+    confidence_threshold: Optional[float] = None
+) -> ChatbotState:
     """
     Issue Classification Node - Classifies user message into issue categories
     
@@ -18,6 +24,7 @@ def issue_classification_node(state: ChatbotState, config: Dict[str, Any], llm:
         state: Current chatbot state
         config: Conversation configuration
         llm: Azure OpenAI LLM instance
+        confidence_threshold: Precomputed classification threshold (read from config if None)
         
     Returns:
         ChatbotState: Updated state
@@ -58,7 +65,8 @@ def issue_classification_node(state: ChatbotState, config: Dict[str, Any], llm:
         )
         
         # Process classification result
-        confidence_threshold = config['conversation_flow']['issue_classification']['confidence_threshold']
+        if confidence_threshold is None:
+            confidence_threshold = config['conversation_flow']['issue_classification']['confidence_threshold']
         
         if classification_result['issue_type'] and classification_result['confidence'] >= confidence_threshold:
             # Successful classification
@@ -26,6 +26,8 @@ class AzureSearchService:
         self.azure_openai_endpoint = os.getenv('AZURE_OPENAI_ENDPOINT')
         self.azure_openai_key = os.getenv('AZURE_OPENAI_KEY')
         self.embedding_model = os.getenv('AZURE_OPENAI_EMBEDDING_MODEL', 'text-embedding-3-small')
+        # 인덱스의 content_vector 차원과 일치해야 함 (setup_search_index.py)
+        self.embedding_dimensions = int(os.getenv('AZURE_OPENAI_EMBEDDING_DIMENSIONS', '512'))
         
         if not self.endpoint or not self.key:
             logger.warning("Azure Search credentials not found - RAG will be disabled")
@@ -46,6 +48,7 @@ class AzureSearchService:
                     azure_endpoint=self.azure_openai_endpoint,
                     api_key=self.azure_openai_key,
                     azure_deployment=self.embedding_model,
+                    dimensions=self.embedding_dimensions,
                     api_version="2024-02-01"
                 )
                 logger.info(f"✅ Azure Search initialized with embeddings: {self.index_name}")
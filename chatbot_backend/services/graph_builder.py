@@ -73,12 +73,18 @@ class VoCChatbotGraphBuilder:
             workflow: StateGraph instance
         """
         
+        # Resolve per-turn config lookups once at build time
+        classification_threshold = self.config['conversation_flow']['issue_classification']['confidence_threshold']
+        
         # Wrapper functions that bind config and llm to nodes
         def state_analyzer_wrapper(state: ChatbotState) -> ChatbotState:
             return state_analysis_node(state, self.config, self.llm)
         
         def issue_classification_wrapper(state: ChatbotState) -> ChatbotState:
-            return issue_classification_node(state, self.config, self.llm, self.search_service)
+            return issue_classification_node(
+                state, self.config, self.llm, self.search_service,
+                confidence_threshold=classification_threshold
+            )
         
         def case_narrowing_wrapper(state: ChatbotState) -> ChatbotState:
             return case_narrowing_node(state, self.config, self.llm, self.search_service)
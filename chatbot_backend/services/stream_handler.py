@@ -43,24 +43,24 @@ class StreamHandler:
             # Create session config
             session_config = self.graph_builder.create_session_config(session_id)
             
-            # Check for existing state
+            # Check for existing state (the checkpointer is shared with /chat, so it is the source of truth)
             existing_state = None
             try:
                 state_snapshot = self.chatbot_graph.get_state(session_config)
                 if state_snapshot and state_snapshot.values:
                     existing_state = state_snapshot.values
-                    logger.info(f"✅ Retrieved existing state for session {session_id[:8]}...")
-                    logger.info(f"   Current issue: {existing_state.get('current_issue')}")
-                    logger.info(f"   Current case: {existing_state.get('current_case')}")
             except Exception as e:
                 logger.info(f"ℹ️ No existing state found for session {session_id[:8]}...")
             
             # Create or update state
             if existing_state:
-                # Update existing state with new message
-                initial_state = existing_state.copy()
-                initial_state['user_message'] = user_message
-                initial_state['conversation_turn'] = initial_state.get('conversation_turn', 0) + 1
+                # Only send the new input; LangGraph resumes the rest from the thread checkpoint
+                next_turn = existing_state.get('conversation_turn', 0) + 1
+                initial_state = {
+                    'user_message': user_message,
+                    'conversation_turn': next_turn
+                }
+                logger.info(f"✅ Resuming session {session_id[:8]}... (turn {next_turn})")
             else:
                 # Create new initial state
                 initial_state = create_initial_state(user_message, session_id)
@@ -74,20 +74,20 @@ class StreamHandler:
             # Stream events from LangGraph
             final_state = None
             async for event in self.chatbot_graph.astream(initial_state, config=session_config):
-                # Get the node name from the event
-                if isinstance(event, dict):
-                    for node_name, node_state in event.items():
-                        if node_name != "__end__":
-                            yield {
-                                "node": node_name, 
-                                "status": "processing",
-                                "details": {
-                                    "current_issue": node_state.get("current_issue"),
-                                    "current_case": node_state.get("current_case"),
-                                    "classification_confidence": node_state.get("classification_confidence", 0.0)
-                                }
-                            }
-                            final_state = node_state
+                # astream yields {node_name: node_state} dicts
+                for node_name, node_state in event.items():
+                    if node_name == "__end__":
+                        continue
+                    yield {
+                        "node": node_name, 
+                        "status": "processing",
+                        "details": {
+                            "current_issue": node_state.get("current_issue"),
+                            "current_case": node_state.get("current_case"),
+                            "classification_confidence": node_state.get("classification_confidence", 0.0)
+                        }
+                    }
+                    final_state = node_state
             
             # Yield the final response
             if final_state:
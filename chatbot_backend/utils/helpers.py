@@ -1,5 +1,6 @@
 # utils/helpers.py
 
+import re
 import json
 import logging
 import asyncio
@@ -8,6 +9,23 @@ from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# 사용자 입력 정제용 패턴 (연속 공백 / 공백 외 whitespace 문자)
+_WS_RE = re.compile(r'\s+')
+_WS_DIRTY_RE = re.compile(r'\s{2,}|[^\S ]')
+_MAX_INPUT_LENGTH = 1000
+
+# 오류 타입 → fallback_responses 키 매핑
+_ERROR_MAPPING = {
+    "classification_failed": "classification_unclear",
+    "case_undetermined": "need_more_info",
+    "max_questions_exceeded": "escalation",
+    "max_turns_reached": "max_turns_reached",
+    "session_timeout": "session_timeout",
+    "general": "general_error",
+    "escalation": "escalation"
+}
+_DEFAULT_ERROR_MESSAGE = "죄송합니다. 오류가 발생했습니다."
+
 def load_conversation_config(config_path: str = "configs/conversation_config.json") -> Dict[str, Any]:
     """
     대화 설정 파일 로딩
@@ -190,20 +208,12 @@ def format_error_response(error_type: str, config: Dict[str, Any]) -> str:
         str: 포맷된 오류 응답
     """
     
-    fallback_responses = config.get("fallback_responses", {})
-    
-    error_mapping = {
-        "classification_failed": "classification_unclear",
-        "case_undetermined": "need_more_info",
-        "max_questions_exceeded": "escalation",
-        "max_turns_reached": "max_turns_reached",
-        "session_timeout": "session_timeout",
-        "general": "general_error",
-        "escalation": "escalation"
-    }
+    fallback_responses = config.get("fallback_responses")
+    if not fallback_responses:
+        return _DEFAULT_ERROR_MESSAGE
     
-    response_key = error_mapping.get(error_type, "general_error")
-    return fallback_responses.get(response_key, "죄송합니다. 오류가 발생했습니다.")
+    response_key = _ERROR_MAPPING.get(error_type, "general_error")
+    return fallback_responses.get(response_key, _DEFAULT_ERROR_MESSAGE)
 
 def is_session_expired(created_at: str, config: Dict[str, Any]) -> bool:
     """
@@ -262,13 +272,19 @@ def sanitize_user_input(user_input: str) -> str:
     if not user_input:
         return ""
     
+    # 이미 정제된 입력은 그대로 반환
+    if (len(user_input) <= _MAX_INPUT_LENGTH
+            and user_input == user_input.strip()
+            and not _WS_DIRTY_RE.search(user_input)):
+        return user_input
+    
     # 기본 정제: 앞뒤 공백 제거, 연속 공백 정리
-    cleaned = ' '.join(user_input.strip().split())
+    cleaned = _WS_RE.sub(' ', user_input.strip())
     
     # 길이 제한 (매우 긴 입력 방지)
-    if len(cleaned) > 1000:
-        cleaned = cleaned[:1000]
-        logger.warning(f"User input truncated to 1000 characters")
+    if len(cleaned) > _MAX_INPUT_LENGTH:
+        cleaned = cleaned[:_MAX_INPUT_LENGTH]
+        logger.warning(f"User input truncated to {_MAX_INPUT_LENGTH} characters")
     
     return cleaned
 
@@ -286,27 +302,32 @@ def log_conversation_analytics(state, config: Dict[str, Any]) -> None:
     if not analytics_config.get("track_conversation_flow", False):
         return
     
+    # INFO 레벨이 꺼져 있으면 메시지 생성 자체를 생략
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    
     try:
         # 대화 흐름 추적
         if analytics_config.get("track_conversation_flow"):
-            logger.info(f"Analytics - Flow: {' → '.join(state.get('node_history', []))}")
+            logger.info("Analytics - Flow: %s", ' → '.join(state.get('node_history', [])))
         
         # 분류 정확도 추적
         if analytics_config.get("track_classification_accuracy"):
-            confidence = state.get('classification_confidence', 0.0)
-            issue = state.get('current_issue', 'None')
-            logger.info(f"Analytics - Classification: {issue} (confidence: {confidence:.2f})")
+            logger.info(
+                "Analytics - Classification: %s (confidence: %.2f)",
+                state.get('current_issue', 'None'),
+                state.get('classification_confidence', 0.0)
+            )
         
         # 해결 성공률 추적
         if analytics_config.get("track_resolution_success"):
             resolved = state.get('resolution_attempted', False)
             escalated = state.get('needs_escalation', False)
-            logger.info(f"Analytics - Resolution: {'Success' if resolved and not escalated else 'Failed/Escalated'}")
+            logger.info("Analytics - Resolution: %s", 'Success' if resolved and not escalated else 'Failed/Escalated')
         
         # 에스컬레이션 이유 추적
         if analytics_config.get("track_escalation_reasons") and state.get('needs_escalation'):
-            reason = state.get('escalation_reason', 'unknown')
-            logger.info(f"Analytics - Escalation: {reason}")
+            logger.info("Analytics - Escalation: %s", state.get('escalation_reason', 'unknown'))
             
     except Exception as e:
         logger.error(f"Analytics logging error: {e}")
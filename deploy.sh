@@ -185,12 +185,27 @@ az cosmosdb sql database create \
   --account-name $COSMOS_ACCOUNT_NAME \
   --name "voc-analytics"
 
+# Indexing policy for the turns container: range index on /timestamp for the
+# processing-window query, composite (session_id, timestamp) for per-session ordered reads
+TURNS_INDEXING_POLICY='{
+  "indexingMode": "consistent",
+  "includedPaths": [
+    {"path": "/timestamp/?", "indexes": [{"kind": "Range", "dataType": "String", "precision": -1}]},
+    {"path": "/*"}
+  ],
+  "excludedPaths": [{"path": "/\"_etag\"/?"}],
+  "compositeIndexes": [
+    [{"path": "/session_id", "order": "ascending"}, {"path": "/timestamp", "order": "ascending"}]
+  ]
+}'
+
 az cosmosdb sql container create \
   --resource-group $RESOURCE_GROUP \
   --account-name $COSMOS_ACCOUNT_NAME \
   --database-name "voc-analytics" \
   --name "turns" \
   --partition-key-path "/session_id" \
+  --idx "$TURNS_INDEXING_POLICY" \
   --throughput 400
 
 az cosmosdb sql container create \
@@ -265,6 +280,7 @@ az webapp config appsettings set \
     AZURE_OPENAI_KEY="${AZURE_OPENAI_KEY}" \
     AZURE_OPENAI_MODEL="gpt-4o-mini" \
     AZURE_OPENAI_EMBEDDING_MODEL="text-embedding-3-small" \
+    AZURE_OPENAI_EMBEDDING_DIMENSIONS="512" \
     AZURE_SEARCH_ENDPOINT="${SEARCH_ENDPOINT}" \
     AZURE_SEARCH_KEY="${SEARCH_KEY}" \
     AZURE_SEARCH_INDEX="oss-knowledge-base" \
@@ -402,6 +418,7 @@ openai>=1.55.3
 httpx>=0.28
 pydantic>=2.0.0
 azure-cosmos==4.5.1
+aiohttp>=3.9
 EOF
 
 # Create zip package
@@ -612,7 +629,7 @@ if command -v python3 &> /dev/null; then
     
     # Install required packages for knowledge base setup
     echo "📦 Installing required packages..."
-    pip install azure-search-documents python-dotenv langchain-openai
+    pip install azure-search-documents==11.5.2 python-dotenv langchain-openai
     
     # Create temporary environment file for the setup script
     cat > .env << EOF
@@ -621,17 +638,25 @@ AZURE_OPENAI_ENDPOINT=${AZURE_OPENAI_ENDPOINT}
 AZURE_OPENAI_KEY=${AZURE_OPENAI_KEY}
 AZURE_OPENAI_MODEL=gpt-4o-mini
 AZURE_OPENAI_EMBEDDING_MODEL=text-embedding-3-small
+AZURE_OPENAI_EMBEDDING_DIMENSIONS=512
 
 # Azure AI Search Configuration
 AZURE_SEARCH_ENDPOINT=${SEARCH_ENDPOINT}
 AZURE_SEARCH_KEY=${SEARCH_KEY}
 AZURE_SEARCH_INDEX=oss-knowledge-base
+# Rebuild an existing index whose schema is incompatible (e.g. older 1536-dim vectors)
+AZURE_SEARCH_RECREATE_INDEX=true
 EOF
     
     # Run the knowledge base setup
     if [ -f setup_search_index.py ]; then
         echo "🚀 Running knowledge base setup..."
-        python setup_search_index.py
+        if ! python setup_search_index.py; then
+            echo "❌ Knowledge base setup failed. Check the output above and rerun setup_search_index.py."
+            deactivate
+            rm -rf venv
+            exit 1
+        fi
     else
         echo "⚠️ setup_search_index.py not found!"
     fi
@@ -709,6 +734,7 @@ openai>=1.55.3
 httpx>=0.28
 pydantic>=2.0.0
 azure-cosmos==4.5.1
+aiohttp>=3.9
 REQUIREMENTS
     elif [[ "\$app_type" == "function_app" ]]; then
         cat > requirements.txt << 'REQUIREMENTS'
@@ -159,6 +159,7 @@ openai>=1.55.3
 httpx>=0.28
 pydantic>=2.0.0
 azure-cosmos==4.5.1
+aiohttp>=3.9
 EOF
 
 # Create deployment package
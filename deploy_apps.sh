@@ -89,6 +89,7 @@ az webapp config appsettings set \
     AZURE_OPENAI_KEY="${AZURE_OPENAI_KEY}" \
     AZURE_OPENAI_MODEL="gpt-4o-mini" \
     AZURE_OPENAI_EMBEDDING_MODEL="text-embedding-3-small" \
+    AZURE_OPENAI_EMBEDDING_DIMENSIONS="512" \
     AZURE_SEARCH_ENDPOINT="${SEARCH_ENDPOINT}" \
     AZURE_SEARCH_KEY="${SEARCH_KEY}" \
     AZURE_SEARCH_INDEX="oss-knowledge-base" \
@@ -248,6 +249,7 @@ openai>=1.55.3
 httpx>=0.28
 pydantic>=2.0.0
 azure-cosmos==4.5.1
+aiohttp>=3.9
 EOF
 
 zip -r ../admin_backend.zip .
@@ -117,6 +117,7 @@ az webapp config appsettings set \
     AZURE_OPENAI_KEY="${AZURE_OPENAI_KEY}" \
     AZURE_OPENAI_MODEL="gpt-4o-mini" \
     AZURE_OPENAI_EMBEDDING_MODEL="text-embedding-3-small" \
+    AZURE_OPENAI_EMBEDDING_DIMENSIONS="512" \
     AZURE_SEARCH_ENDPOINT="${SEARCH_ENDPOINT}" \
     AZURE_SEARCH_KEY="${SEARCH_KEY}" \
     AZURE_SEARCH_INDEX="oss-knowledge-base" \
@@ -50,6 +50,7 @@ AZURE_OPENAI_ENDPOINT=${AZURE_OPENAI_ENDPOINT}
 AZURE_OPENAI_KEY=${AZURE_OPENAI_KEY}
 AZURE_OPENAI_MODEL=${OPENAI_MODEL}
 AZURE_OPENAI_EMBEDDING_MODEL=${EMBEDDING_MODEL}
+AZURE_OPENAI_EMBEDDING_DIMENSIONS=512
 
 # Azure AI Search Configuration
 AZURE_SEARCH_ENDPOINT=${SEARCH_ENDPOINT}
@@ -140,15 +140,34 @@ az cosmosdb sql database create \
   --account-name $COSMOS_ACCOUNT_NAME \
   --name "voc-analytics"
 
+# Indexing policy for the turns container: range index on /timestamp for the
+# processing-window query, composite (session_id, timestamp) for per-session ordered reads
+TURNS_INDEXING_POLICY='{
+  "indexingMode": "consistent",
+  "includedPaths": [
+    {"path": "/timestamp/?", "indexes": [{"kind": "Range", "dataType": "String", "precision": -1}]},
+    {"path": "/*"}
+  ],
+  "excludedPaths": [{"path": "/\"_etag\"/?"}],
+  "compositeIndexes": [
+    [{"path": "/session_id", "order": "ascending"}, {"path": "/timestamp", "order": "ascending"}]
+  ]
+}'
+
 # Create containers
 for container in "turns" "conversations" "statistics"; do
   echo "  Creating container: $container"
+  IDX_ARGS=()
+  if [ "$container" == "turns" ]; then
+    IDX_ARGS=(--idx "$TURNS_INDEXING_POLICY")
+  fi
   az cosmosdb sql container create \
     --resource-group $RESOURCE_GROUP \
     --account-name $COSMOS_ACCOUNT_NAME \
     --database-name "voc-analytics" \
     --name $container \
     --partition-key-path "/session_id" \
+    "${IDX_ARGS[@]}" \
     --throughput 400
 done
 
@@ -213,11 +232,14 @@ AZURE_OPENAI_ENDPOINT=${AZURE_OPENAI_ENDPOINT}
 AZURE_OPENAI_KEY=${AZURE_OPENAI_KEY}
 AZURE_OPENAI_MODEL=gpt-4o-mini
 AZURE_OPENAI_EMBEDDING_MODEL=text-embedding-3-small
+AZURE_OPENAI_EMBEDDING_DIMENSIONS=512
 
 # Azure AI Search Configuration
 AZURE_SEARCH_ENDPOINT=${SEARCH_ENDPOINT}
 AZURE_SEARCH_KEY=${SEARCH_KEY}
 AZURE_SEARCH_INDEX=oss-knowledge-base
+# Rebuild an existing index whose schema is incompatible (e.g. older 1536-dim vectors)
+AZURE_SEARCH_RECREATE_INDEX=true
 EOF
 
 echo "✅ Environment file created"
@@ -232,11 +254,16 @@ if command -v python3 &> /dev/null; then
     source venv/bin/activate
     
     echo "📦 Installing required packages..."
-    pip install azure-search-documents python-dotenv langchain-openai
+    pip install azure-search-documents==11.5.2 python-dotenv langchain-openai
     
     if [ -f setup_search_index.py ]; then
         echo "🚀 Running knowledge base setup..."
-        python setup_search_index.py
+        if ! python setup_search_index.py; then
+            echo "❌ Knowledge base setup failed. Check the output above and rerun setup_search_index.py."
+            deactivate
+            rm -rf venv
+            exit 1
+        fi
         echo "✅ Knowledge base setup complete"
     else
         echo "⚠️ setup_search_index.py not found! Please run it manually later."
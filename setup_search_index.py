@@ -1,7 +1,14 @@
 # setup_search_index.py - Hybrid Vector + Semantic Search Setup
 
 import os
+import sys
 import json
+import asyncio
+import base64
+import hashlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from azure.search.documents.indexes import SearchIndexClient
 from azure.search.documents.indexes.models import (
     SearchIndex,
@@ -10,6 +17,7 @@ from azure.search.documents.indexes.models import (
     SearchFieldDataType,
     VectorSearch,
     VectorSearchProfile,
+    ScalarQuantizationCompression,
     HnswAlgorithmConfiguration,
     SemanticConfiguration,
     SemanticField,
@@ -18,8 +26,9 @@ from azure.search.documents.indexes.models import (
     SearchField,
     VectorSearchAlgorithmKind
 )
-from azure.search.documents import SearchClient
+from azure.search.documents import SearchClient, SearchIndexingBufferedSender
 from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError
 from langchain_openai import AzureOpenAIEmbeddings
 from dotenv import load_dotenv
 
@@ -30,33 +39,78 @@ load_dotenv()
 SEARCH_ENDPOINT = os.getenv('AZURE_SEARCH_ENDPOINT')
 SEARCH_KEY = os.getenv('AZURE_SEARCH_KEY')
 INDEX_NAME = os.getenv('AZURE_SEARCH_INDEX', 'oss-knowledge-base')
+# Drop and recreate the index when its schema cannot be updated in place (destructive)
+RECREATE_INDEX = os.getenv('AZURE_SEARCH_RECREATE_INDEX', 'false').lower() == 'true'
 
 # Embedding configuration
 AZURE_OPENAI_ENDPOINT = os.getenv('AZURE_OPENAI_ENDPOINT')
 AZURE_OPENAI_KEY = os.getenv('AZURE_OPENAI_KEY')
-EMBEDDING_MODEL = os.getenv('AZURE_OPENAI_EMBEDDING_MODEL', 'text-embedding-ada-002')
+EMBEDDING_MODEL = os.getenv('AZURE_OPENAI_EMBEDDING_MODEL', 'text-embedding-3-small')
+EMBEDDING_DIMENSIONS = int(os.getenv('AZURE_OPENAI_EMBEDDING_DIMENSIONS', '512'))
+
+# Texts sent per embedding request, max requests in flight, and retries per request
+EMBEDDING_BATCH_SIZE = 16
+EMBEDDING_CONCURRENCY = int(os.getenv('EMBEDDING_CONCURRENCY', '5'))
+EMBEDDING_MAX_RETRIES = 6
+
+# Max documents per upload request (Azure AI Search accepts at most 1000 actions and 16 MB
+# per batch), and retries per document action on throttled or failed batches
+UPLOAD_BATCH_SIZE = 1000
+UPLOAD_MAX_PAYLOAD_BYTES = 16 * 1024 * 1024
+UPLOAD_MAX_RETRIES = 6
+
+# Local cache of generated embeddings, keyed by sha256 of model, dimensions and embedding text
+EMBEDDING_CACHE_FILE = os.getenv('EMBEDDING_CACHE_FILE', '.embed_cache.json')
+
+# Knowledge base fields stored in the index as-is (conditions is stored as conditions_json)
+SCHEMA_FIELDS = frozenset({
+    'id', 'issue_type', 'issue_name', 'case_type', 'case_name', 'description',
+    'search_content', 'keywords', 'questions_to_ask', 'solution_steps',
+    'escalation_triggers', 'conditions_json'
+})
 
 # Knowledge base file path
 KNOWLEDGE_BASE_FILE = os.getenv('KNOWLEDGE_BASE_FILE', 'knowledge_base.json')
 
-# Initialize embeddings
-embeddings = AzureOpenAIEmbeddings(
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-    api_key=AZURE_OPENAI_KEY,
-    azure_deployment=EMBEDDING_MODEL,
-    api_version="2024-02-01"
-)
+def get_embeddings() -> AzureOpenAIEmbeddings:
+    """Create an embeddings client (one per event loop: its async HTTP client is bound to the loop that first uses it)"""
+    if not AZURE_OPENAI_ENDPOINT or not AZURE_OPENAI_KEY:
+        raise ValueError("AZURE_OPENAI_ENDPOINT and AZURE_OPENAI_KEY must be set to generate embeddings")
+    
+    return AzureOpenAIEmbeddings(
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        api_key=AZURE_OPENAI_KEY,
+        azure_deployment=EMBEDDING_MODEL,
+        dimensions=EMBEDDING_DIMENSIONS,
+        api_version="2024-02-01",
+        # The OpenAI client retries 429/5xx/connection errors with jittered exponential
+        # backoff and honours Retry-After, so throttled batches are retried rather than lost
+        max_retries=EMBEDDING_MAX_RETRIES
+    )
+
+@lru_cache(maxsize=None)
+def get_index_client() -> SearchIndexClient:
+    """Shared index client, so index operations reuse one HTTP connection pool"""
+    return SearchIndexClient(
+        endpoint=SEARCH_ENDPOINT,
+        credential=AzureKeyCredential(SEARCH_KEY)
+    )
+
+@lru_cache(maxsize=None)
+def get_search_client() -> SearchClient:
+    """Shared search client, so uploads and test queries reuse one HTTP connection pool"""
+    return SearchClient(
+        endpoint=SEARCH_ENDPOINT,
+        index_name=INDEX_NAME,
+        credential=AzureKeyCredential(SEARCH_KEY)
+    )
 
 def create_search_index():
     """Create the search index with vector and semantic search capabilities"""
     
     print(f"🔍 Creating hybrid search index: {INDEX_NAME}")
     
-    # Initialize the index client
-    index_client = SearchIndexClient(
-        endpoint=SEARCH_ENDPOINT,
-        credential=AzureKeyCredential(SEARCH_KEY)
-    )
+    index_client = get_index_client()
     
     # Define the index schema with vector field
     fields = [
@@ -66,7 +120,11 @@ def create_search_index():
         SimpleField(name="case_type", type=SearchFieldDataType.String, filterable=True),
         SearchableField(name="case_name", type=SearchFieldDataType.String),
         SearchableField(name="description", type=SearchFieldDataType.String),
+        # Used for keyword/semantic matching; it duplicates other fields, so queries leave it out of select
+        # (kept retrievable because semantic ranking reads it as a content field)
         SearchableField(name="search_content", type=SearchFieldDataType.String),
+        # Hash of the uploaded content, used to skip unchanged documents on re-runs
+        SimpleField(name="content_hash", type=SearchFieldDataType.String, filterable=True),
         
         # Array fields
         SearchField(
@@ -98,7 +156,9 @@ def create_search_index():
             name="content_vector",
             type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
             searchable=True,
-            vector_search_dimensions=1536,
+            # Not returned in results; nothing selects the raw vector
+            hidden=True,
+            vector_search_dimensions=EMBEDDING_DIMENSIONS,
             vector_search_profile_name="myHnswProfile"
         )
     ]
@@ -109,18 +169,30 @@ def create_search_index():
             HnswAlgorithmConfiguration(
                 name="myHnsw",
                 kind=VectorSearchAlgorithmKind.HNSW,
+                # m/efConstruction are fixed at graph build time, efSearch is the query-time
+                # candidate list; a denser graph with a smaller efSearch improves both recall and latency
                 parameters={
-                    "m": 4,
-                    "efConstruction": 400,
-                    "efSearch": 500,
+                    "m": 16,
+                    "efConstruction": 200,
+                    "efSearch": 100,
                     "metric": "cosine"
                 }
             )
         ],
+        # Store vectors as int8 in the HNSW graph; full-precision vectors are still uploaded
+        compressions=[
+            # Oversample candidates from the int8 graph and rescore them with the original vectors
+            ScalarQuantizationCompression(
+                compression_name="mySq",
+                rerank_with_original_vectors=True,
+                default_oversampling=4.0
+            )
+        ],
         profiles=[
             VectorSearchProfile(
                 name="myHnswProfile",
-                algorithm_configuration_name="myHnsw"
+                algorithm_configuration_name="myHnsw",
+                compression_name="mySq"
             )
         ]
     )
@@ -147,24 +219,222 @@ def create_search_index():
     )
     
     try:
-        result = index_client.create_or_update_index(index)
+        try:
+            result = index_client.create_or_update_index(index)
+        except HttpResponseError as e:
+            # Changes to existing fields or HNSW build parameters are rejected with 400;
+            # dropping the live index is only done when explicitly requested
+            if e.status_code != 400 or not RECREATE_INDEX:
+                raise
+            print(f"⚠️ Index '{INDEX_NAME}' cannot be updated in place, recreating (AZURE_SEARCH_RECREATE_INDEX=true)...")
+            index_client.delete_index(INDEX_NAME)
+            result = index_client.create_index(index)
         print(f"✅ Index '{result.name}' created with hybrid search capabilities!")
         return True
+    except HttpResponseError as e:
+        print(f"❌ Error creating index: {e}")
+        if e.status_code == 400 and not RECREATE_INDEX:
+            print("   If the existing index schema cannot be updated in place, rerun with "
+                  "AZURE_SEARCH_RECREATE_INDEX=true to drop and recreate it")
+        return False
     except Exception as e:
         print(f"❌ Error creating index: {e}")
         return False
 
-def generate_embeddings(text: str) -> list:
-    """Generate embeddings for text using Azure OpenAI"""
+async def _embed_batches(texts: list, on_batch=None) -> list:
+    """Embed texts in EMBEDDING_BATCH_SIZE batches, EMBEDDING_CONCURRENCY requests in flight"""
+    # A fresh client for this asyncio.run loop; also fails fast on missing configuration
+    embeddings = get_embeddings()
+    semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+    
+    async def embed_one(text):
+        async with semaphore:
+            try:
+                return await embeddings.aembed_query(text)
+            except Exception as e:
+                print(f"❌ Error generating embedding for '{text[:50]}...': {e}")
+                return None
+    
+    async def embed(start, batch):
+        try:
+            async with semaphore:
+                vectors = await embeddings.aembed_documents(batch, chunk_size=EMBEDDING_BATCH_SIZE)
+        except Exception as e:
+            # Retry only this batch's texts one by one, so one bad input doesn't fail the others
+            print(f"⚠️ Embedding batch of {len(batch)} failed, retrying per text: {e}")
+            vectors = await asyncio.gather(*(embed_one(text) for text in batch))
+        if on_batch:
+            on_batch(start, vectors)
+        return vectors
+    
+    starts = range(0, len(texts), EMBEDDING_BATCH_SIZE)
+    results = await asyncio.gather(*(embed(i, texts[i:i + EMBEDDING_BATCH_SIZE]) for i in starts))
+    return [vector for batch_vectors in results for vector in batch_vectors]
+
+def _pack_vector(vector: list) -> str:
+    """Encode a vector as base64 float32 bytes (the precision the index stores)"""
+    return base64.b64encode(array('f', vector).tobytes()).decode('ascii')
+
+def _unpack_vector(packed) -> list:
+    """Decode a vector written by _pack_vector"""
+    vector = array('f')
+    vector.frombytes(base64.b64decode(packed))
+    return vector.tolist()
+
+def load_embedding_cache() -> dict:
+    """Load cached embeddings from EMBEDDING_CACHE_FILE"""
     try:
-        embedding = embeddings.embed_query(text)
-        return embedding
-    except Exception as e:
-        print(f"❌ Error generating embeddings: {e}")
+        with open(EMBEDDING_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return {key: _unpack_vector(packed) for key, packed in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+    except (ValueError, TypeError, OSError) as e:
+        print(f"⚠️ Ignoring unreadable embedding cache {EMBEDDING_CACHE_FILE}: {e}")
+        return {}
+
+def save_embedding_cache(cache: dict):
+    """Write cached embeddings back to EMBEDDING_CACHE_FILE as packed float32 vectors"""
+    try:
+        with open(EMBEDDING_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({key: _pack_vector(vector) for key, vector in cache.items()}, f)
+    except OSError as e:
+        print(f"⚠️ Could not write embedding cache {EMBEDDING_CACHE_FILE}: {e}")
+
+def generate_embeddings_batch(texts: list, on_ready=None) -> list:
+    """Generate embeddings for many texts, reusing cached vectors for unchanged texts
+    
+    If given, on_ready(indices, vectors) is called with the cached vectors first and
+    then as each batch completes, so callers can start using vectors before all are done.
+    """
+    cache = load_embedding_cache()
+    # Vectors from a different model or dimension count must not be reused
+    key_prefix = f"{EMBEDDING_MODEL}:{EMBEDDING_DIMENSIONS}:"
+    keys = [hashlib.sha256((key_prefix + text).encode('utf-8')).hexdigest() for text in texts]
+    missing = {key: text for key, text in zip(keys, texts) if key not in cache}
+    
+    print(f"   💾 Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} to generate")
+    
+    on_batch = None
+    if on_ready:
+        cached = [i for i, key in enumerate(keys) if key in cache]
+        if cached:
+            on_ready(cached, [cache[keys[i]] for i in cached])
+        
+        positions = {}
+        for i, key in enumerate(keys):
+            positions.setdefault(key, []).append(i)
+        missing_keys = list(missing)
+        
+        def on_batch(start, vectors):
+            ready = [(i, vector) for key, vector in zip(missing_keys[start:], vectors)
+                     if vector is not None for i in positions[key]]
+            if ready:
+                on_ready([i for i, _ in ready], [vector for _, vector in ready])
+    
+    if missing:
+        try:
+            vectors = asyncio.run(_embed_batches(list(missing.values()), on_batch))
+        except Exception as e:
+            print(f"❌ Error generating embeddings: {e}")
+            return None
+        # Keep every vector that succeeded, so a re-run only requests the failed texts
+        cache.update((key, vector) for key, vector in zip(missing.keys(), vectors) if vector is not None)
+        save_embedding_cache(cache)
+    
+    if any(key not in cache for key in keys):
         return None
+    
+    return [cache[key] for key in keys]
+
+def compute_content_hash(processed_doc: dict) -> str:
+    """Hash a processed document together with the embedding settings it is vectorized with"""
+    payload = json.dumps(processed_doc, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{EMBEDDING_MODEL}:{EMBEDDING_DIMENSIONS}:{payload}".encode('utf-8')).hexdigest()
+
+def estimate_upload_batch_size(documents: list) -> int:
+    """Pick the largest batch size whose payload stays well under the request size limit"""
+    sample = documents[:100]
+    # Documents are sized before their embeddings exist, so add one serialized vector each
+    vector_bytes = len(json.dumps([-0.0123456789] * EMBEDDING_DIMENSIONS))
+    avg_doc_bytes = sum(len(json.dumps(doc)) for doc in sample) / len(sample) + vector_bytes
+    # Leave headroom for the request envelope and larger-than-average documents
+    return max(1, min(UPLOAD_BATCH_SIZE, int(UPLOAD_MAX_PAYLOAD_BYTES * 0.8 / avg_doc_bytes)))
+
+def get_indexed_content_hashes(search_client: SearchClient) -> dict:
+    """Fetch {id: content_hash} for documents already in the index"""
+    try:
+        results = search_client.search(search_text="*", select=["id", "content_hash"], top=10000)
+        return {result['id']: result.get('content_hash') for result in results}
+    except Exception as e:
+        print(f"⚠️ Could not read existing content hashes, uploading all documents: {e}")
+        return {}
+
+def build_embedding_texts(documents: list) -> tuple:
+    """Convert knowledge base entries to index documents and build their aligned embedding texts"""
+    processed_documents = []
+    embedding_texts = []
+    
+    ignored_fields = set()
+    
+    for doc in documents:
+        # Project onto the index schema; the index rejects documents with unknown fields
+        processed_doc = {key: value for key, value in doc.items() if key in SCHEMA_FIELDS}
+        ignored_fields.update(key for key in doc if key not in SCHEMA_FIELDS and key != 'conditions')
+        
+        # Create text for embedding: search_content already holds the issue/case names,
+        # keywords and description, so only the conditions are added to it
+        conditions_text = ""
+        
+        # Convert conditions dict to JSON string for storage
+        if 'conditions' in doc:
+            conditions = doc['conditions']
+            processed_doc['conditions_json'] = json.dumps(conditions, ensure_ascii=False)
+            conditions_text = " ".join(conditions.values())
+        elif 'conditions_json' in processed_doc:
+            conditions_text = " ".join(json.loads(processed_doc['conditions_json']).values())
+        
+        processed_doc['content_hash'] = compute_content_hash(processed_doc)
+        embedding_texts.append(f"{processed_doc['search_content']} {conditions_text}".strip())
+        processed_documents.append(processed_doc)
+    
+    if ignored_fields:
+        print(f"⚠️ Ignoring fields not in the index schema: {', '.join(sorted(ignored_fields))}")
+    
+    return processed_documents, embedding_texts
+
+def select_changed_documents(processed_documents: list, embedding_texts: list, search_client: SearchClient) -> list:
+    """Return (document, embedding text) pairs whose content hash differs from the indexed one"""
+    indexed_hashes = get_indexed_content_hashes(search_client)
+    return [
+        (processed_doc, text)
+        for processed_doc, text in zip(processed_documents, embedding_texts)
+        if indexed_hashes.get(processed_doc['id']) != processed_doc['content_hash']
+    ]
+
+def prepare_embeddings():
+    """Embed new or changed knowledge base documents into the embedding cache ahead of upload
+    
+    Runs while create_search_index() is in flight. With RECREATE_INDEX the index may be
+    deleted and recreated meanwhile, so its content hashes are not read and every document
+    is embedded (cached vectors make this free for unchanged text).
+    """
+    documents = load_knowledge_base()
+    if not documents:
+        return
+    
+    processed_documents, embedding_texts = build_embedding_texts(documents)
+    if RECREATE_INDEX:
+        texts = embedding_texts
+    else:
+        changed = select_changed_documents(processed_documents, embedding_texts, get_search_client())
+        texts = [text for _, text in changed]
+    if texts:
+        print(f"🔄 Pre-generating embeddings for {len(texts)} documents...")
+        generate_embeddings_batch(texts)
 
+@lru_cache(maxsize=1)
 def load_knowledge_base():
-    """Load knowledge base data from JSON file"""
+    """Load knowledge base data from JSON file (parsed once per process)"""
     
     try:
         with open(KNOWLEDGE_BASE_FILE, 'r', encoding='utf-8') as f:
@@ -186,12 +456,7 @@ def upload_knowledge_base_with_embeddings():
     
     print("📤 Uploading knowledge base with embeddings...")
     
-    # Initialize search client
-    search_client = SearchClient(
-        endpoint=SEARCH_ENDPOINT,
-        index_name=INDEX_NAME,
-        credential=AzureKeyCredential(SEARCH_KEY)
-    )
+    search_client = get_search_client()
     
     # Load knowledge base
     documents = load_knowledge_base()
@@ -201,53 +466,75 @@ def upload_knowledge_base_with_embeddings():
         return False
     
     # Process documents for upload
-    processed_documents = []
+    processed_documents, embedding_texts = build_embedding_texts(documents)
     
-    for doc in documents:
-        # Create a copy to avoid modifying the original
-        processed_doc = doc.copy()
-        
-        # Convert conditions dict to JSON string for storage
-        if 'conditions' in processed_doc:
-            processed_doc['conditions_json'] = json.dumps(processed_doc['conditions'], ensure_ascii=False)
-            # Remove the original conditions field as it's not in our schema
-            del processed_doc['conditions']
-        
-        # Create combined text for embedding
-        conditions_text = ""
-        if 'conditions_json' in processed_doc:
-            conditions_dict = json.loads(processed_doc['conditions_json'])
-            conditions_text = " ".join(conditions_dict.values())
-        
-        embedding_text = f"{processed_doc['case_name']} {processed_doc['description']} {conditions_text} {processed_doc['search_content']}"
-        
-        # Generate embedding
-        print(f"🔄 Generating embedding for: {processed_doc['id']}")
-        embedding = generate_embeddings(embedding_text)
-        
-        if embedding:
-            processed_doc['content_vector'] = embedding
-            processed_documents.append(processed_doc)
-        else:
-            print(f"⚠️ Failed to generate embedding for {processed_doc['id']}")
+    # Skip documents whose content is unchanged since the last upload
+    changed = select_changed_documents(processed_documents, embedding_texts, search_client)
+    
+    if not changed:
+        print(f"✅ All {len(processed_documents)} documents are up to date, nothing to upload")
+        return True
+    
+    print(f"   {len(processed_documents) - len(changed)} unchanged, {len(changed)} new or modified")
+    processed_documents = [processed_doc for processed_doc, _ in changed]
+    embedding_texts = [text for _, text in changed]
+    
+    # The buffered sender batches the actions, retries throttled (429/503) and
+    # partially failed (207) batches, and splits batches that are too large
+    failed_ids = []
+    uploaded_count = 0
+    
+    def on_progress(action):
+        nonlocal uploaded_count
+        uploaded_count += 1
+    
+    def on_error(action):
+        failed_ids.append(action.additional_properties.get('id'))
+    
+    batch_size = estimate_upload_batch_size(processed_documents)
+    print(f"   Upload batch size: {batch_size} documents")
     
     try:
-        # Upload documents
-        result = search_client.upload_documents(documents=processed_documents)
+        with SearchIndexingBufferedSender(
+            endpoint=SEARCH_ENDPOINT,
+            index_name=INDEX_NAME,
+            credential=AzureKeyCredential(SEARCH_KEY),
+            initial_batch_size=batch_size,
+            max_retries_per_action=UPLOAD_MAX_RETRIES,
+            on_progress=on_progress,
+            on_error=on_error
+        ) as sender, ThreadPoolExecutor(max_workers=1) as uploader:
+            # Hand each embedded batch to a single upload thread as soon as it is ready,
+            # so uploads to Search overlap with the remaining embedding requests
+            upload_futures = []
+            
+            def on_ready(indices, vectors):
+                ready_documents = []
+                for i, vector in zip(indices, vectors):
+                    processed_documents[i]['content_vector'] = vector
+                    ready_documents.append(processed_documents[i])
+                upload_futures.append(uploader.submit(sender.merge_or_upload_documents, documents=ready_documents))
+            
+            print(f"🔄 Generating embeddings for {len(embedding_texts)} documents...")
+            vectors = generate_embeddings_batch(embedding_texts, on_ready=on_ready)
+            
+            for future in upload_futures:
+                future.result()
         
-        # Check results
-        success_count = sum(1 for r in result if r.succeeded)
-        total_count = len(result)
+        if not vectors:
+            # Documents whose embeddings succeeded were still uploaded; a re-run retries the rest
+            print("❌ Failed to generate embeddings")
+            return False
         
-        print(f"✅ Upload completed: {success_count}/{total_count} documents uploaded successfully")
+        total_count = len(processed_documents)
+        print(f"✅ Upload completed: {uploaded_count}/{total_count} documents uploaded successfully")
         
-        if success_count < total_count:
+        if failed_ids:
             print("❌ Some documents failed to upload:")
-            for r in result:
-                if not r.succeeded:
-                    print(f"   - {r.key}: {r.error_message}")
+            for doc_id in failed_ids:
+                print(f"   - {doc_id}")
         
-        return success_count == total_count
+        return not failed_ids and uploaded_count == total_count
         
     except Exception as e:
         print(f"❌ Error uploading documents: {e}")
@@ -258,11 +545,7 @@ def test_hybrid_search():
     
     print("🧪 Testing hybrid search functionality...")
     
-    search_client = SearchClient(
-        endpoint=SEARCH_ENDPOINT,
-        index_name=INDEX_NAME,
-        credential=AzureKeyCredential(SEARCH_KEY)
-    )
+    search_client = get_search_client()
     
     # Test queries
     test_queries = [
@@ -272,34 +555,43 @@ def test_hybrid_search():
         "9사번이 필요해요"
     ]
     
-    for query in test_queries:
-        print(f"\n🔍 Query: '{query}'")
-        
-        # Generate query embedding
-        query_embedding = generate_embeddings(query)
+    # Embed all test queries in one batch, reusing cached vectors from earlier runs
+    query_embeddings = generate_embeddings_batch(test_queries)
+    
+    if not query_embeddings:
+        print("   ❌ Failed to generate query embeddings")
+        return
+    
+    from azure.search.documents.models import VectorizedQuery
+    
+    def run_search(query, query_embedding):
+        # Hybrid search: vector + keyword + semantic
+        vector_query = VectorizedQuery(
+            vector=query_embedding,
+            k_nearest_neighbors=3,
+            fields="content_vector"
+        )
         
-        if not query_embedding:
-            print("   ❌ Failed to generate query embedding")
-            continue
+        results = search_client.search(
+            search_text=query,
+            vector_queries=[vector_query],
+            query_type="semantic",
+            semantic_configuration_name="default",
+            top=3,
+            select=["id", "case_name", "description", "conditions_json"]
+        )
+        return list(results)
+    
+    # The search SDK is synchronous, so issue the queries from a thread pool
+    with ThreadPoolExecutor(max_workers=len(test_queries)) as executor:
+        futures = [executor.submit(run_search, query, query_embedding)
+                   for query, query_embedding in zip(test_queries, query_embeddings)]
+    
+    for query, future in zip(test_queries, futures):
+        print(f"\n🔍 Query: '{query}'")
         
         try:
-            # Hybrid search: vector + keyword + semantic
-            from azure.search.documents.models import VectorizedQuery
-            
-            vector_query = VectorizedQuery(
-                vector=query_embedding,
-                k_nearest_neighbors=3,
-                fields="content_vector"
-            )
-            
-            results = search_client.search(
-                search_text=query,
-                vector_queries=[vector_query],
-                query_type="semantic",
-                semantic_configuration_name="default",
-                top=3,
-                select=["id", "case_name", "description", "conditions_json"]
-            )
+            results = future.result()
             
             print(f"   Hybrid search results:")
             for i, result in enumerate(results, 1):
@@ -332,11 +624,17 @@ def main():
     print("🚀 Setting up Azure AI Search with Hybrid Search (Vector + Semantic)...")
     print(f"   Search Endpoint: {SEARCH_ENDPOINT}")
     print(f"   Index: {INDEX_NAME}")
-    print(f"   Embedding Model: {EMBEDDING_MODEL}")
+    print(f"   Embedding Model: {EMBEDDING_MODEL} ({EMBEDDING_DIMENSIONS} dims)")
     print(f"   Knowledge Base File: {KNOWLEDGE_BASE_FILE}")
     
-    # Step 1: Create index with vector and semantic capabilities
-    if not create_search_index():
+    # Step 1: Create index with vector and semantic capabilities. Index creation is
+    # control-plane latency, so load the knowledge base and generate embeddings meanwhile
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        index_future = executor.submit(create_search_index)
+        prepare_embeddings()
+        index_created = index_future.result()
+    
+    if not index_created:
         return False
     
     # Step 2: Upload knowledge base with embeddings
@@ -352,4 +650,4 @@ def main():
     return True
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(0 if main() else 1)
\ No newline at end of file